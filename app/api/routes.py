@@ -1,4 +1,6 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from ..database import get_db
 from .. import crud
@@ -6,20 +8,20 @@ from ..models import pydantic
 import pandas as pd
 from utility import preprocess
 from datetime import datetime
-import glob
+import asyncio
+import orjson
 
 router = APIRouter()
 
+# Reference data changes only on upload, so clients may reuse it briefly
+REFERENCE_CACHE_CONTROL = "public, max-age=30"
 
-@router.get("/", tags=["root"])
-def root():
-    """
-    Welcome to the Steel Production API
+# Rows handed to a crud.store_* call at a time, so each transaction stays bounded
+CHUNK_SIZE = 5000
 
-    This is the main entry point for the Steel Production Planning & Forecasting System.
-    Navigate to `/docs` for interactive API documentation.
-    """
-    return {
+# The root payload never changes, so it is serialized once at import
+ROOT_BODY = orjson.dumps(
+    {
         "message": "Steel Production Forecast API",
         "version": "1.0.0",
         "docs": "/docs",
@@ -32,6 +34,73 @@ def root():
             "steel_grades": "/steel-grades",
         },
     }
+)
+
+
+def store_in_chunks(store, frames, db: Session) -> int:
+    """
+    Run a crud.store_* function over fixed-size slices of one or more DataFrames.
+
+    Args:
+        store: CRUD function taking (df, db) and returning the records inserted
+        frames: Long-format DataFrame, or an iterable of them (e.g. CSV chunks)
+        db (Session): Database session
+
+    Returns:
+        int: Total number of records inserted across all chunks
+    """
+    if isinstance(frames, pd.DataFrame):
+        frames = [frames]
+    return sum(
+        store(df.iloc[start : start + CHUNK_SIZE], db)
+        for df in frames
+        for start in range(0, len(df), CHUNK_SIZE)
+    )
+
+
+def prepare_schedule(date_str: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Shape one date's parsed schedule into the columns crud.store_daily_schedule expects.
+
+    Args:
+        date_str (str): Schedule date as "YYYY-MM-DD"
+        df (pd.DataFrame): Rows from preprocess.handle_non_tabular for that date
+
+    Returns:
+        pd.DataFrame: Rows with date, grade_name, start_time and mould_size
+    """
+    # Blank cells arrive as None; store them as NaN like the saved CSVs
+    df = df.where(df.notna())
+    df["date"] = date_str
+    # Rename columns to match expected format
+    df = df.rename(columns={"grade": "grade_name"})
+
+    # Clean up start_time to remove the 1900-01-01 date part
+    if "start_time" in df.columns:
+        raw = df["start_time"].astype(str)
+        parsed = pd.to_datetime(raw, format="mixed", errors="coerce")
+        df["start_time"] = parsed.dt.strftime("%H:%M:%S").fillna(raw)
+    return df
+
+
+async def validated_upload(file: UploadFile = File(...)) -> UploadFile:
+    """Dependency that rejects uploads which are not CSV or Excel files."""
+    if preprocess.file_extension(file) not in preprocess.ALLOWED_EXTENSIONS:
+        raise HTTPException(
+            status_code=400, detail="Only CSV or Excel files are supported"
+        )
+    return file
+
+
+@router.get("/", tags=["root"])
+def root():
+    """
+    Welcome to the Steel Production API
+
+    This is the main entry point for the Steel Production Planning & Forecasting System.
+    Navigate to `/docs` for interactive API documentation.
+    """
+    return Response(content=ROOT_BODY, media_type="application/json")
 
 
 @router.get("/health", tags=["health"])
@@ -47,8 +116,8 @@ def health_check(db: Session = Depends(get_db)):
     - System timestamp
     """
     try:
-        product_groups_count = len(crud.get_product_groups(db))
-        steel_grades_count = len(crud.get_steel_grades(db, limit=1000))
+        product_groups_count = crud.count_product_groups(db)
+        steel_grades_count = crud.count_steel_grades(db)
 
         return {
             "status": "healthy",
@@ -99,10 +168,13 @@ def forecast_production(
 
 @router.post(
     "/upload/product-groups",
-    response_model=pydantic.UploadResponse,
+    response_model=None,
+    responses={200: {"model": pydantic.UploadResponse}},
     tags=["data-upload"],
 )
-def upload_product_groups(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_product_groups(
+    file: UploadFile = Depends(validated_upload), db: Session = Depends(get_db)
+):
     """
     ## Upload product_groups_monthly file
 
@@ -110,37 +182,29 @@ def upload_product_groups(file: UploadFile = File(...), db: Session = Depends(ge
 
     This function stores records on the ProductGroup table and ForecastedProduction.
     """
-    if not file.filename.endswith((".csv", ".xlsx", ".xls")):
-        raise HTTPException(
-            status_code=400, detail="Only CSV or Excel files are supported"
-        )
-
     try:
-        df = preprocess.sheet_to_pandas(file)
+        # Parsed here; melted block by block on the worker thread while stored
+        df_transformed = await run_in_threadpool(preprocess.iter_product_groups, file)
 
-        df_transformed = df.melt(
-            id_vars="Quality:", var_name="date", value_name="heats"
-        )
-        df_transformed = df_transformed.rename(
-            columns={"Quality:": "product_group_name"}
-        )
-
-        records = crud.store_product_groups(df_transformed, db)
-        return pydantic.UploadResponse(
-            message=f"Product groups and forecasted production uploaded successfully. {records} records inserted.",
-            records_inserted=records,
+        records = await run_in_threadpool(
+            store_in_chunks, crud.store_product_groups, df_transformed, db
         )
+        return {
+            "message": f"Product groups and forecasted production uploaded successfully. {records} records inserted.",
+            "records_inserted": records,
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
 
 @router.post(
     "/upload/production-history",
-    response_model=pydantic.UploadResponse,
+    response_model=None,
+    responses={200: {"model": pydantic.UploadResponse}},
     tags=["data-upload"],
 )
-def upload_production_history(
-    file: UploadFile = File(...), db: Session = Depends(get_db)
+async def upload_production_history(
+    file: UploadFile = Depends(validated_upload), db: Session = Depends(get_db)
 ):
     """
     ## Upload steel_grade_production file
@@ -149,29 +213,32 @@ def upload_production_history(
 
     **Accepted Formats:** `.xlsx`, `.xls`, `.csv`
     """
-    if not file.filename.endswith((".csv", ".xlsx", ".xls")):
-        raise HTTPException(
-            status_code=400, detail="Only CSV or Excel files are supported"
-        )
-
     try:
-        df = preprocess.process_steel_grade(file)
-        records = crud.store_production_history(df, db)
-
-        return pydantic.UploadResponse(
-            message=f"Production history uploaded successfully. {records} records inserted.",
-            records_inserted=records,
+        # CSV uploads are parsed and stored chunk by chunk on the worker thread
+        records = await run_in_threadpool(
+            store_in_chunks,
+            crud.store_production_history,
+            preprocess.iter_steel_grade(file),
+            db,
         )
+
+        return {
+            "message": f"Production history uploaded successfully. {records} records inserted.",
+            "records_inserted": records,
+        }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
 
 @router.post(
     "/upload/daily-schedule",
-    response_model=pydantic.UploadResponse,
+    response_model=None,
+    responses={200: {"model": pydantic.UploadResponse}},
     tags=["data-upload"],
 )
-def upload_daily_schedule(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_daily_schedule(
+    file: UploadFile = Depends(validated_upload), db: Session = Depends(get_db)
+):
     """
     ## Upload Daily Production Schedule
 
@@ -180,49 +247,31 @@ def upload_daily_schedule(file: UploadFile = File(...), db: Session = Depends(ge
     This function processes non-tabular data with triplet format.
     It stores records on the DailyProductionSchedule table.
     """
-    if not file.filename.endswith((".csv", ".xlsx", ".xls")):
-        raise HTTPException(
-            status_code=400, detail="Only CSV or Excel files are supported"
-        )
-
     try:
-        # Process the non-tabular file and save CSV files
-        success = preprocess.handle_non_tabular(file)
+        # Parse the non-tabular file; it also saves one CSV per date
+        schedules = await run_in_threadpool(preprocess.handle_non_tabular, file)
 
-        if not success:
+        if schedules is None:
             raise HTTPException(
                 status_code=500, detail="Failed to process the daily schedule file"
             )
 
-        processed_files = glob.glob("data/processed/charge_schedule_*.csv")
-
-        total_records = 0
-        for csv_file in processed_files:
-            df = pd.read_csv(csv_file)
-            # Add date column based on filename
-            date_str = csv_file.split("_")[-1].replace(".csv", "")
-            df["date"] = date_str
-            # Rename columns to match expected format
-            df = df.rename(columns={"grade": "grade_name"})
-
-            # Clean up start_time to remove the 1900-01-01 date part
-            if "start_time" in df.columns:
-                df["start_time"] = df["start_time"].apply(
-                    lambda x: (
-                        pd.to_datetime(str(x)).strftime("%H:%M:%S")
-                        if pd.notna(x) and str(x) != "nan"
-                        else str(x)
-                    )
-                )
-
-            records = crud.store_daily_schedule(df, db)
-            total_records += records
-
-        return pydantic.UploadResponse(
-            message=f"Daily schedule uploaded successfully. {total_records} records inserted from {len(processed_files)} dates.",
-            records_inserted=total_records,
+        # Shape the per-date frames concurrently, then store them in bounded chunks
+        frames = await asyncio.gather(
+            *(
+                run_in_threadpool(prepare_schedule, date_str, df)
+                for date_str, df in schedules.items()
+            )
+        )
+        total_records = await run_in_threadpool(
+            store_in_chunks, crud.store_daily_schedule, frames, db
         )
 
+        return {
+            "message": f"Daily schedule uploaded successfully. {total_records} records inserted from {len(frames)} dates.",
+            "records_inserted": total_records,
+        }
+
     except HTTPException:
         raise  # Re-raise HTTPExceptions as-is
     except Exception as e:
@@ -237,11 +286,14 @@ def get_product_groups(db: Session = Depends(get_db)):
     Retrieve a complete list of steel product group classifications
     used for organizing and categorizing steel grades.
     """
-    groups = crud.get_product_groups(db)
-    return [{"id": g.id, "name": g.name} for g in groups]
+    return Response(
+        content=crud.get_product_groups_json(db),
+        media_type="application/json",
+        headers={"Cache-Control": REFERENCE_CACHE_CONTROL},
+    )
 
 
-@router.get("/steel-grades", tags=["reference"])
+@router.get("/steel-grades", response_class=ORJSONResponse, tags=["reference"])
 def get_steel_grades(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     """
     Get steel grades with pagination
@@ -250,13 +302,16 @@ def get_steel_grades(skip: int = 0, limit: int = 100, db: Session = Depends(get_
     Supports pagination for large datasets.
     """
     grades = crud.get_steel_grades(db, skip=skip, limit=limit)
-    return [
-        {"id": g.id, "name": g.name, "product_group_id": g.product_group_id}
-        for g in grades
-    ]
+    return ORJSONResponse(
+        [
+            {"id": g.id, "name": g.name, "product_group_id": g.product_group_id}
+            for g in grades
+        ],
+        headers={"Cache-Control": REFERENCE_CACHE_CONTROL},
+    )
 
 
-@router.get("/forecasted-production", tags=["reference"])
+@router.get("/forecasted-production", response_class=ORJSONResponse, tags=["reference"])
 def get_forecasted_production(db: Session = Depends(get_db)):
     """
     Get all forecasted production data
@@ -265,19 +320,22 @@ def get_forecasted_production(db: Session = Depends(get_db)):
     Returns date, heats, and associated product group information.
     """
     forecasted_data = crud.get_forecasted_production(db)
-    return [
-        {
-            "id": f.id,
-            "date": f.date,
-            "heats": f.heats,
-            "product_group_id": f.product_group_id,
-            "product_group_name": f.product_group.name if f.product_group else None,
-        }
-        for f in forecasted_data
-    ]
-
-
-@router.get("/historical-production", tags=["reference"])
+    return ORJSONResponse(
+        [
+            {
+                "id": f.id,
+                "date": f.date,
+                "heats": f.heats,
+                "product_group_id": f.product_group_id,
+                "product_group_name": f.product_group_name,
+            }
+            for f in forecasted_data
+        ],
+        headers={"Cache-Control": REFERENCE_CACHE_CONTROL},
+    )
+
+
+@router.get("/historical-production", response_class=ORJSONResponse, tags=["reference"])
 def get_historical_production(db: Session = Depends(get_db)):
     """
     Get HistoricalProduction table.
@@ -286,19 +344,21 @@ def get_historical_production(db: Session = Depends(get_db)):
     Returns date, tons, and associated steel grade information.
     """
     historical_data = crud.get_historical_production(db, limit=1000)  # Get more records
-    return [
-        {
-            "id": h.id,
-            "date": h.date,
-            "tons": h.tons,
-            "grade_id": h.grade_id,
-            "grade_name": h.grade.name if h.grade else None,
-        }
-        for h in historical_data
-    ]
-
-
-@router.get("/daily-schedules", tags=["reference"])
+    return ORJSONResponse(
+        [
+            {
+                "id": h.id,
+                "date": h.date,
+                "tons": h.tons,
+                "grade_id": h.grade_id,
+                "grade_name": h.grade_name,
+            }
+            for h in historical_data
+        ]
+    )
+
+
+@router.get("/daily-schedules", response_class=ORJSONResponse, tags=["reference"])
 def get_daily_schedules(db: Session = Depends(get_db)):
     """
     Get all daily production schedules
@@ -307,14 +367,16 @@ def get_daily_schedules(db: Session = Depends(get_db)):
     Returns date, start time, mould size, and associated steel grade information.
     """
     schedule_data = crud.get_daily_schedule(db, limit=1000)  # Get more records
-    return [
-        {
-            "id": s.id,
-            "date": s.date,
-            "start_time": s.start_time,
-            "mould_size": s.mould_size,
-            "grade_id": s.grade_id,
-            "grade_name": s.grade.name if s.grade else None,
-        }
-        for s in schedule_data
-    ]
+    return ORJSONResponse(
+        [
+            {
+                "id": s.id,
+                "date": s.date,
+                "start_time": s.start_time,
+                "mould_size": s.mould_size,
+                "grade_id": s.grade_id,
+                "grade_name": s.grade_name,
+            }
+            for s in schedule_data
+        ]
+    )
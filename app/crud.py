@@ -1,11 +1,211 @@
+from sqlalchemy import Row, extract, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import date, datetime
+from threading import Lock
+import io
+from cachetools import TTLCache, cached
+from cachetools.keys import hashkey
+import numpy as np
+import orjson
 import pandas as pd
 from fastapi import HTTPException
 from .models import schema
 from .models import pydantic
 
+# Dates reach the store_* functions as date objects or "YYYY-MM-DD" strings
+DATE_FORMAT = "%Y-%m-%d"
+
+# History batches at least this large are loaded with COPY instead of INSERT
+COPY_MIN_ROWS = 1000
+
+# Seconds a cached read may be served for. Writes through this process clear
+# the caches at once; the TTL bounds staleness after writes made elsewhere
+# (psql, init.sql loads, other workers or replicas).
+CACHE_TTL = 60
+
+# Reference reads only change when new rows are stored; every store_* and
+# create_* function calls clear_reference_cache() after committing
+reference_cache = TTLCache(maxsize=32, ttl=CACHE_TTL)
+_reference_lock = Lock()
+
+# Reference reads and forecasts are keyed on data_version, bumped by
+# clear_reference_cache(), so a result computed while an upload commits can
+# never be served as current
+forecast_cache = TTLCache(maxsize=256, ttl=CACHE_TTL)
+data_version = 0
+
+
+def _cached_reference(name: str):
+    """Cache a reference read, keyed on name, data_version and arguments."""
+    return cached(
+        reference_cache,
+        key=lambda db, *args, **kwargs: hashkey(name, data_version, *args, **kwargs),
+        lock=_reference_lock,
+    )
+
+
+def clear_reference_cache() -> None:
+    """Drop every cached reference read and forecast after new data is stored."""
+    global data_version
+    with _reference_lock:
+        reference_cache.clear()
+        data_version += 1
+
+
+def get_steel_grade_ids(db: Session, names) -> Dict[str, int]:
+    """Map the given steel grade names to ids with a single SELECT ... IN."""
+    names = list(names)
+    if not names:
+        return {}
+    return dict(
+        db.query(schema.SteelGrade.name, schema.SteelGrade.id)
+        .filter(schema.SteelGrade.name.in_(names))
+        .all()
+    )
+
+
+def get_product_group_ids(db: Session, names) -> Dict[str, int]:
+    """Map the given product group names to ids with a single SELECT ... IN."""
+    names = list(names)
+    if not names:
+        return {}
+    return dict(
+        db.query(schema.ProductGroup.name, schema.ProductGroup.id)
+        .filter(schema.ProductGroup.name.in_(names))
+        .all()
+    )
+
+
+def create_product_groups(db: Session, names) -> Dict[str, int]:
+    """
+    Insert new product groups in one statement and map their names to ids.
+
+    Names that already exist (e.g. created by a concurrent upload) are skipped
+    by ON CONFLICT and left out of the returned map.
+    """
+    rows = [{"name": name} for name in names]
+    if not rows:
+        return {}
+    return dict(
+        db.execute(
+            pg_insert(schema.ProductGroup)
+            .on_conflict_do_nothing(index_elements=["name"])
+            .returning(schema.ProductGroup.name, schema.ProductGroup.id),
+            rows,
+        ).all()
+    )
+
+
+def get_or_create_product_group_ids(db: Session, names) -> Tuple[Dict[str, int], int]:
+    """
+    Map product group names to ids, inserting the missing groups in bulk.
+
+    Args:
+        db (Session): Database session
+        names: Product group names, in first-seen order
+
+    Returns:
+        Tuple[Dict[str, int], int]: Name to id map covering every requested
+        name, and the number of groups this call created
+    """
+    names = list(dict.fromkeys(names))
+    group_ids = get_product_group_ids(db, names)
+    new_groups = create_product_groups(
+        db, [name for name in names if name not in group_ids]
+    )
+    group_ids.update(new_groups)
+    # Pick up any group a concurrent upload created in the meantime
+    group_ids.update(
+        get_product_group_ids(db, [name for name in names if name not in group_ids])
+    )
+    return group_ids, len(new_groups)
+
+
+def merge_grade_ids(df: pd.DataFrame, grade_ids: Dict[str, int]) -> pd.DataFrame:
+    """
+    Attach grade_id to every row by grade_name in one vectorized merge.
+
+    Args:
+        df (pd.DataFrame): DataFrame with a str grade_name column
+        grade_ids (Dict[str, int]): Steel grade name to id map
+
+    Returns:
+        pd.DataFrame: Rows of known grades with an added grade_id column
+    """
+    grades = pd.DataFrame(
+        {"grade_name": list(grade_ids), "grade_id": list(grade_ids.values())}
+    )
+    return df.merge(grades, on="grade_name", how="inner")
+
+
+def to_dates(values: pd.Series):
+    """Convert a column of dates or DATE_FORMAT strings to datetime.date in one pass."""
+    return pd.to_datetime(values, format=DATE_FORMAT, cache=True).dt.date.to_numpy()
+
+
+def insert_new(db: Session, model, rows: List[dict], keys: List[str]) -> int:
+    """
+    Bulk insert rows, letting the database skip those whose keys are already stored.
+
+    Args:
+        db (Session): Database session
+        model: ORM model with a unique constraint over keys
+        rows (List[dict]): Column values for each new row
+        keys (List[str]): Columns of the unique constraint used as conflict target
+
+    Returns:
+        int: Number of rows actually inserted
+    """
+    if not rows:
+        return 0
+    stmt = (
+        pg_insert(model).on_conflict_do_nothing(index_elements=keys).returning(model.id)
+    )
+    return len(db.execute(stmt, rows).all())
+
+
+def copy_new(db: Session, model, records: pd.DataFrame, keys: List[str]) -> int:
+    """
+    Bulk load rows with COPY, letting the database skip those whose keys are stored.
+
+    The rows are streamed as CSV into a session-local temp table, then moved with a
+    single INSERT ... SELECT ... ON CONFLICT DO NOTHING inside the open transaction.
+
+    Args:
+        db (Session): Database session (psycopg2)
+        model: ORM model with a unique constraint over keys
+        records (pd.DataFrame): New rows, one column per target column
+        keys (List[str]): Columns of the unique constraint used as conflict target
+
+    Returns:
+        int: Number of rows actually inserted
+    """
+    table = model.__table__.name
+    staging = f"{table}_load"
+    columns = ", ".join(records.columns)
+
+    buffer = io.StringIO()
+    records.to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+
+    with db.connection().connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMP TABLE IF NOT EXISTS {staging} ON COMMIT DELETE ROWS AS "
+            f"SELECT {columns} FROM {table} WITH NO DATA"
+        )
+        cursor.copy_expert(
+            f"COPY {staging} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+        cursor.execute(
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} "
+            f"ON CONFLICT ({', '.join(keys)}) DO NOTHING"
+        )
+        inserted = cursor.rowcount
+        cursor.execute(f"TRUNCATE {staging}")
+    return inserted
+
 
 def store_production_history(df: pd.DataFrame, db: Session) -> int:
     """
@@ -19,66 +219,72 @@ def store_production_history(df: pd.DataFrame, db: Session) -> int:
     Returns:
         int: Number of records inserted
     """
-    records_inserted = 0
-
-    for _, row in df.iterrows():
-        # Find or create the product group if product_group_id exists
-        product_group = None
-        if "product_group_id" in row and pd.notna(row["product_group_id"]):
-            product_group = (
-                db.query(schema.ProductGroup)
-                .filter(schema.ProductGroup.name == str(row["product_group_id"]))
-                .first()
-            )
-
-            if not product_group:
-                product_group = schema.ProductGroup(name=str(row["product_group_id"]))
-                db.add(product_group)
-                db.commit()
-                db.refresh(product_group)
-
-        # Find or create the steel grade
-        steel_grade = (
-            db.query(schema.SteelGrade)
-            .filter(schema.SteelGrade.name == str(row["grade_name"]))
-            .first()
+    # Clean the key columns once; everything below reads them as-is
+    df = df.assign(grade_name=df["grade_name"].astype(str))
+    grade_ids = get_steel_grade_ids(db, df["grade_name"].unique())
+
+    # Create the product groups and steel grades that don't exist yet
+    if "product_group_id" in df:
+        group_names = df["product_group_id"].dropna().astype(str).unique()
+        group_ids, _ = get_or_create_product_group_ids(db, group_names)
+    else:
+        group_ids = {}
+
+    new_grades = df[~df["grade_name"].isin(grade_ids.keys())]
+    new_grades = new_grades.drop_duplicates("grade_name")
+    if not new_grades.empty:
+        groups = (
+            new_grades["product_group_id"]
+            if "product_group_id" in new_grades
+            else [None] * len(new_grades)
         )
-
-        if not steel_grade:
-            # Create new steel grade
-            steel_grade = schema.SteelGrade(
-                name=str(row["grade_name"]),
-                product_group_id=product_group.id if product_group else None,
-            )
-            db.add(steel_grade)
-            db.commit()
-            db.refresh(steel_grade)
-
-        # Convert date if needed
-        production_date = (
-            pd.to_datetime(row["date"]).date()
-            if isinstance(row["date"], str)
-            else row["date"]
+        grade_rows = [
+            {
+                "name": name,
+                "product_group_id": (
+                    group_ids[str(group)] if pd.notna(group) else None
+                ),
+            }
+            for name, group in zip(new_grades["grade_name"], groups)
+        ]
+        grade_ids.update(
+            db.execute(
+                pg_insert(schema.SteelGrade)
+                .on_conflict_do_nothing(index_elements=["name"])
+                .returning(schema.SteelGrade.name, schema.SteelGrade.id),
+                grade_rows,
+            ).all()
         )
-
-        # Check if record already exists
-        existing = (
-            db.query(schema.HistoricalProduction)
-            .filter(
-                schema.HistoricalProduction.date == production_date,
-                schema.HistoricalProduction.grade_id == steel_grade.id,
+        # Pick up any grade a concurrent upload created in the meantime
+        grade_ids.update(
+            get_steel_grade_ids(
+                db, [row["name"] for row in grade_rows if row["name"] not in grade_ids]
             )
-            .first()
         )
 
-        if not existing:
-            production_record = schema.HistoricalProduction(
-                date=production_date, tons=int(row["tons"]), grade_id=steel_grade.id
-            )
-            db.add(production_record)
-            records_inserted += 1
+    df = merge_grade_ids(df, grade_ids)
+    records = pd.DataFrame(
+        {
+            "date": to_dates(df["date"]),
+            "tons": df["tons"].astype("int64").to_numpy(),
+            "grade_id": df["grade_id"].astype("int64").to_numpy(),
+        }
+    )
 
+    # (grade_id, date) pairs that are already stored are skipped by the database
+    if len(records) >= COPY_MIN_ROWS:
+        records_inserted = copy_new(
+            db, schema.HistoricalProduction, records, ["grade_id", "date"]
+        )
+    else:
+        records_inserted = insert_new(
+            db,
+            schema.HistoricalProduction,
+            records.to_dict("records"),
+            ["grade_id", "date"],
+        )
     db.commit()
+    clear_reference_cache()
     return records_inserted
 
 
@@ -94,76 +300,59 @@ def store_product_groups(df: pd.DataFrame, db: Session) -> int:
         int: Number of records inserted (groups + forecasted production)
     """
 
-    records_inserted = 0
-
-    # First, store unique product groups
-    unique_groups = df["product_group_name"].dropna().unique()
-
-    for group_name in unique_groups:
-        existing_group = (
-            db.query(schema.ProductGroup)
-            .filter(schema.ProductGroup.name == str(group_name))
-            .first()
-        )
+    # Clean the group names once; everything below reads them as-is
+    df = df.dropna(subset=["product_group_name"])
+    df = df.assign(product_group_name=df["product_group_name"].astype(str))
 
-        if not existing_group:
-            product_group = schema.ProductGroup(name=str(group_name))
-            db.add(product_group)
-            records_inserted += 1
-
-    db.commit()
+    # Resolve the groups in one SELECT and create the missing ones in one INSERT
+    group_ids, records_inserted = get_or_create_product_group_ids(
+        db, df["product_group_name"]
+    )
 
     # Now store forecasted production data
-    for _, row in df.iterrows():
-        if (
-            pd.isna(row["product_group_name"])
-            or pd.isna(row["date"])
-            or pd.isna(row["heats"])
-        ):
-            continue
-
-        # Find the product group
-        product_group = (
-            db.query(schema.ProductGroup)
-            .filter(schema.ProductGroup.name == str(row["product_group_name"]))
-            .first()
-        )
+    forecasts = df.dropna(subset=["date", "heats"])
+    forecasts = forecasts.assign(
+        product_group_id=forecasts["product_group_name"].map(group_ids)
+    )
+    forecasts = forecasts.dropna(subset=["product_group_id"])
+
+    records = pd.DataFrame(
+        {
+            "date": to_dates(forecasts["date"]),
+            "heats": forecasts["heats"].astype("int64").to_numpy(),
+            "product_group_id": forecasts["product_group_id"]
+            .astype("int64")
+            .to_numpy(),
+        }
+    )
 
-        if product_group:
+    # (product_group_id, date) pairs that are already stored are skipped
+    records_inserted += insert_new(
+        db,
+        schema.ForecastedProduction,
+        records.to_dict("records"),
+        ["product_group_id", "date"],
+    )
+    db.commit()
+    clear_reference_cache()
+    return records_inserted
 
-            # Convert date if needed
-            forecast_date = (
-                pd.to_datetime(row["date"]).date()
-                if isinstance(row["date"], str)
-                else row["date"]
-            )
 
-            # Check if forecasted production record already exists
-            existing_forecast = (
-                db.query(schema.ForecastedProduction)
-                .filter(
-                    schema.ForecastedProduction.date == forecast_date,
-                    schema.ForecastedProduction.product_group_id == product_group.id,
-                )
-                .first()
-            )
+@_cached_reference("product_groups")
+def get_product_groups(db: Session) -> List[Row]:
+    """Get all product groups as (id, name) rows."""
+    return db.execute(select(schema.ProductGroup.id, schema.ProductGroup.name)).all()
 
-            if not existing_forecast:
-                forecasted_production = schema.ForecastedProduction(
-                    date=forecast_date,
-                    heats=int(row["heats"]) if not pd.isna(row["heats"]) else 0,
-                    product_group_id=product_group.id,
-                )
-                db.add(forecasted_production)
-                records_inserted += 1
 
-    db.commit()
-    return records_inserted
+@_cached_reference("product_groups_json")
+def get_product_groups_json(db: Session) -> bytes:
+    """Get all product groups as an already serialized JSON array."""
+    return orjson.dumps([{"id": g.id, "name": g.name} for g in get_product_groups(db)])
 
 
-def get_product_groups(db: Session) -> List[schema.ProductGroup]:
-    """Get all product groups."""
-    return db.query(schema.ProductGroup).all()
+def count_product_groups(db: Session) -> int:
+    """Count product groups with a single SELECT COUNT(*)."""
+    return db.execute(select(func.count(schema.ProductGroup.id))).scalar()
 
 
 def get_product_group_by_name(db: Session, name: str) -> Optional[schema.ProductGroup]:
@@ -178,6 +367,7 @@ def create_product_group(db: Session, name: str) -> schema.ProductGroup:
     db_product_group = schema.ProductGroup(name=name)
     db.add(db_product_group)
     db.commit()
+    clear_reference_cache()
     db.refresh(db_product_group)
     return db_product_group
 
@@ -187,11 +377,23 @@ def get_steel_grade_by_name(db: Session, name: str) -> Optional[schema.SteelGrad
     return db.query(schema.SteelGrade).filter(schema.SteelGrade.name == name).first()
 
 
-def get_steel_grades(
-    db: Session, skip: int = 0, limit: int = 100
-) -> List[schema.SteelGrade]:
-    """Get steel grades with pagination."""
-    return db.query(schema.SteelGrade).offset(skip).limit(limit).all()
+@_cached_reference("steel_grades")
+def get_steel_grades(db: Session, skip: int = 0, limit: int = 100) -> List[Row]:
+    """Get steel grades as (id, name, product_group_id) rows with pagination."""
+    return db.execute(
+        select(
+            schema.SteelGrade.id,
+            schema.SteelGrade.name,
+            schema.SteelGrade.product_group_id,
+        )
+        .offset(skip)
+        .limit(limit)
+    ).all()
+
+
+def count_steel_grades(db: Session) -> int:
+    """Count steel grades with a single SELECT COUNT(*)."""
+    return db.execute(select(func.count(schema.SteelGrade.id))).scalar()
 
 
 def create_steel_grade(
@@ -201,6 +403,7 @@ def create_steel_grade(
     db_steel_grade = schema.SteelGrade(name=name, product_group_id=product_group_id)
     db.add(db_steel_grade)
     db.commit()
+    clear_reference_cache()
     db.refresh(db_steel_grade)
     return db_steel_grade
 
@@ -212,31 +415,59 @@ def get_historical_production(
     end_date: Optional[date] = None,
     skip: int = 0,
     limit: int = 100,
-) -> List[schema.HistoricalProduction]:
-    """Get historical production with optional filters."""
-    query = db.query(schema.HistoricalProduction)
+) -> List[Row]:
+    """
+    Get historical production with optional filters as plain rows.
+
+    Args:
+        db (Session): Database session
+        grade_id (Optional[int]): Only rows of this steel grade
+        start_date (Optional[date]): Only rows on or after this date
+        end_date (Optional[date]): Only rows on or before this date
+        skip (int): Rows to skip
+        limit (int): Maximum rows to return
+
+    Returns:
+        List[Row]: Rows with id, date, tons, grade_id and grade_name
+    """
+    query = select(
+        schema.HistoricalProduction.id,
+        schema.HistoricalProduction.date,
+        schema.HistoricalProduction.tons,
+        schema.HistoricalProduction.grade_id,
+        schema.SteelGrade.name.label("grade_name"),
+    ).outerjoin(schema.HistoricalProduction.grade)
 
     if grade_id:
-        query = query.filter(schema.HistoricalProduction.grade_id == grade_id)
+        query = query.where(schema.HistoricalProduction.grade_id == grade_id)
     if start_date:
-        query = query.filter(schema.HistoricalProduction.date >= start_date)
+        query = query.where(schema.HistoricalProduction.date >= start_date)
     if end_date:
-        query = query.filter(schema.HistoricalProduction.date <= end_date)
+        query = query.where(schema.HistoricalProduction.date <= end_date)
 
-    return query.offset(skip).limit(limit).all()
+    return db.execute(query.offset(skip).limit(limit)).all()
 
 
-def get_forecasted_production(db: Session) -> List[schema.ForecastedProduction]:
+@_cached_reference("forecasted_production")
+def get_forecasted_production(db: Session) -> List[Row]:
     """
-    Get ForecastedProduction table
+    Get ForecastedProduction table joined with the product group name
 
     Args:
         db (Session): Database session
 
     Returns:
-        List[schema.ForecastedProduction]: List of forecasted production records
+        List[Row]: Rows with id, date, heats, product_group_id and product_group_name
     """
-    return db.query(schema.ForecastedProduction).all()
+    return db.execute(
+        select(
+            schema.ForecastedProduction.id,
+            schema.ForecastedProduction.date,
+            schema.ForecastedProduction.heats,
+            schema.ForecastedProduction.product_group_id,
+            schema.ProductGroup.name.label("product_group_name"),
+        ).outerjoin(schema.ForecastedProduction.product_group)
+    ).all()
 
 
 def get_daily_schedule(
@@ -245,16 +476,35 @@ def get_daily_schedule(
     grade_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
-) -> List[schema.DailyProductionSchedule]:
-    """Get daily production schedule with optional filters."""
-    query = db.query(schema.DailyProductionSchedule)
+) -> List[Row]:
+    """
+    Get daily production schedule with optional filters as plain rows.
+
+    Args:
+        db (Session): Database session
+        schedule_date (Optional[date]): Only rows scheduled on this date
+        grade_id (Optional[int]): Only rows of this steel grade
+        skip (int): Rows to skip
+        limit (int): Maximum rows to return
+
+    Returns:
+        List[Row]: Rows with id, date, start_time, mould_size, grade_id and grade_name
+    """
+    query = select(
+        schema.DailyProductionSchedule.id,
+        schema.DailyProductionSchedule.date,
+        schema.DailyProductionSchedule.start_time,
+        schema.DailyProductionSchedule.mould_size,
+        schema.DailyProductionSchedule.grade_id,
+        schema.SteelGrade.name.label("grade_name"),
+    ).outerjoin(schema.DailyProductionSchedule.grade)
 
     if schedule_date:
-        query = query.filter(schema.DailyProductionSchedule.date == schedule_date)
+        query = query.where(schema.DailyProductionSchedule.date == schedule_date)
     if grade_id:
-        query = query.filter(schema.DailyProductionSchedule.grade_id == grade_id)
+        query = query.where(schema.DailyProductionSchedule.grade_id == grade_id)
 
-    return query.offset(skip).limit(limit).all()
+    return db.execute(query.offset(skip).limit(limit)).all()
 
 
 def store_daily_schedule(df: pd.DataFrame, db: Session) -> int:
@@ -268,37 +518,33 @@ def store_daily_schedule(df: pd.DataFrame, db: Session) -> int:
     Returns:
         int: Number of records inserted
     """
-    records_inserted = 0
-
-    for _, row in df.iterrows():
-        # Find the steel grade
-        steel_grade = (
-            db.query(schema.SteelGrade)
-            .filter(schema.SteelGrade.name == str(row["grade_name"]))
-            .first()
-        )
-
-        if steel_grade:
-            # Convert date if needed
-            schedule_date = (
-                pd.to_datetime(row["date"]).date()
-                if isinstance(row["date"], str)
-                else row["date"]
-            )
-
-            schedule_record = schema.DailyProductionSchedule(
-                date=schedule_date,
-                start_time=str(row.get("start_time", "")),
-                mould_size=str(row.get("mould_size", "")),
-                grade_id=steel_grade.id,
-            )
-            db.add(schedule_record)
-            records_inserted += 1
+    df = df.assign(grade_name=df["grade_name"].astype(str))
+    grade_ids = get_steel_grade_ids(db, df["grade_name"].unique())
+    df = merge_grade_ids(df, grade_ids)
+    records = pd.DataFrame(
+        {
+            "date": to_dates(df["date"]),
+            "start_time": df["start_time"].astype(str) if "start_time" in df else "",
+            "mould_size": df["mould_size"].astype(str) if "mould_size" in df else "",
+            "grade_id": df["grade_id"].astype("int64").to_numpy(),
+        }
+    )
+    new_records = records.to_dict("records")
 
+    if new_records:
+        db.execute(insert(schema.DailyProductionSchedule), new_records)
     db.commit()
-    return records_inserted
+    clear_reference_cache()
+    return len(new_records)
 
 
+@cached(
+    forecast_cache,
+    key=lambda request, db: hashkey(
+        data_version, *sorted(request.grade_percentages.items())
+    ),
+    lock=_reference_lock,
+)
 def compute_forecast(
     request: pydantic.ForecastRequest, db: Session
 ) -> pydantic.ForecastOutput:
@@ -321,38 +567,44 @@ def compute_forecast(
 
     forecast_date = date(2024, 9, 24)
 
-    # get ForecastedProduction table
-    forecasted_data = get_forecasted_production(db)
-
-    # return month forecast
-    september_heats_by_group = {}
-    for forecast in forecasted_data:
-        if forecast.date.month == 9 and forecast.date.year == 2024:
-            group_name = (
-                forecast.product_group.name if forecast.product_group else "Unknown"
+    # Sum September heats per product group in the database
+    september_heats_by_group = dict(
+        db.execute(
+            select(
+                schema.ProductGroup.name, func.sum(schema.ForecastedProduction.heats)
             )
-            if group_name not in september_heats_by_group:
-                september_heats_by_group[group_name] = 0
-            september_heats_by_group[group_name] += forecast.heats
-
-    # Calculate heats breakdown based on grade weights
-    grade_breakdown = {}
-    total_heats = 0
-
-    for grade_name, weight_percentage in request.grade_percentages.items():
-        # Find which product group this grade belongs to
-        steel_grade = get_steel_grade_by_name(db, grade_name)
-
-        if steel_grade and steel_grade.product_group:
-            group_name = steel_grade.product_group.name
-            group_total_heats = september_heats_by_group.get(group_name, 0)
-
-            # Calculate heats for this grade: group_heats * (weight / 100)
-            grade_heats = int(group_total_heats * (weight_percentage / 100))
-            grade_breakdown[grade_name] = grade_heats
-            total_heats += grade_heats
-        else:
-            grade_breakdown[grade_name] = 0
+            .join(schema.ForecastedProduction.product_group)
+            .where(
+                extract("month", schema.ForecastedProduction.date) == 9,
+                extract("year", schema.ForecastedProduction.date) == 2024,
+            )
+            .group_by(schema.ProductGroup.name)
+        ).all()
+    )
+
+    # Find which product group each requested grade belongs to
+    group_by_grade = dict(
+        db.execute(
+            select(schema.SteelGrade.name, schema.ProductGroup.name)
+            .join(schema.SteelGrade.product_group)
+            .where(schema.SteelGrade.name.in_(list(request.grade_percentages)))
+        ).all()
+    )
+
+    # Calculate heats for every grade at once: group_heats * (weight / 100)
+    grade_names = list(request.grade_percentages)
+    weights = np.fromiter(
+        request.grade_percentages.values(), dtype=np.float64, count=len(grade_names)
+    )
+    group_totals = np.array(
+        [
+            september_heats_by_group.get(group_by_grade.get(grade_name), 0)
+            for grade_name in grade_names
+        ],
+        dtype=np.float64,
+    )
+    grade_heats = (group_totals * (weights / 100)).astype(np.int64)
+    grade_breakdown = dict(zip(grade_names, grade_heats.tolist()))
 
     return pydantic.ForecastOutput(
         forecast_date=forecast_date, grade_breakdown=grade_breakdown
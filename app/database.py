@@ -10,8 +10,23 @@ DB_PASSWORD = os.getenv("DB_PASSWORD", "steel")
 DB_NAME = os.getenv("DB_NAME", "steel_db")
 
 POSTGRES_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_engine(POSTGRES_URL)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+# Bulk INSERTs are sent as multi-row VALUES pages of up to 5000 rows (the upload
+# chunk size), and other executemany statements go through psycopg2's batch helper.
+# The pool is sized for the threadpool that runs sync routes and upload work;
+# pre-ping and recycle drop connections the server or a proxy closed while idle.
+engine = create_engine(
+    POSTGRES_URL,
+    pool_size=20,
+    max_overflow=10,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    executemany_mode="values_plus_batch",
+    insertmanyvalues_page_size=5000,
+)
+SessionLocal = sessionmaker(
+    bind=engine, autoflush=False, autocommit=False, expire_on_commit=False
+)
 
 Base = declarative_base()
 
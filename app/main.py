@@ -1,8 +1,18 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from .api.routes import router
 from .database import Base, engine
 
-Base.metadata.create_all(bind=engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The schema normally comes from init.sql; opt in to creating missing tables
+    if os.getenv("AUTO_CREATE_SCHEMA") == "1":
+        Base.metadata.create_all(bind=engine)
+    yield
+
 
 app = FastAPI(
     title="Steel Production API",
@@ -31,6 +41,8 @@ A simple API and database schema implemented for a steel plant's production plan
 Built with **FastAPI** + **PostgreSQL** for high-performance, production-ready deployment with Docker support. Useful links:
     """,
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
     openapi_tags=[
         {"name": "root", "description": "🏠 Welcome & navigation endpoints"},
         {
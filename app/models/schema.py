@@ -1,4 +1,12 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date
+from sqlalchemy import (
+    Column,
+    Integer,
+    String,
+    ForeignKey,
+    Date,
+    Index,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 from ..database import Base
 
@@ -30,6 +38,12 @@ class HistoricalProduction(Base):
 
     grade = relationship("SteelGrade", back_populates="productions")
 
+    __table_args__ = (
+        UniqueConstraint(
+            "grade_id", "date", name="uq_historical_production_grade_date"
+        ),
+    )
+
 
 class ForecastedProduction(Base):
     __tablename__ = "forecasted_production"
@@ -40,6 +54,12 @@ class ForecastedProduction(Base):
 
     product_group = relationship("ProductGroup", backref="forecasted_production")
 
+    __table_args__ = (
+        UniqueConstraint(
+            "product_group_id", "date", name="uq_forecasted_production_group_date"
+        ),
+    )
+
 
 class DailyProductionSchedule(Base):
     __tablename__ = "daily_production_schedule"
@@ -50,3 +70,7 @@ class DailyProductionSchedule(Base):
 
     grade_id = Column(Integer, ForeignKey("steel_grades.id"), nullable=False)
     grade = relationship("SteelGrade", backref="scheduled_heats")
+
+    __table_args__ = (
+        Index("idx_daily_production_schedule_date_grade", "date", "grade_id"),
+    )
@@ -28,7 +28,8 @@ CREATE TABLE historical_production (
     id SERIAL PRIMARY KEY,
     date DATE,
     tons INTEGER,
-    grade_id INTEGER REFERENCES steel_grades(id)
+    grade_id INTEGER REFERENCES steel_grades(id),
+    CONSTRAINT uq_historical_production_grade_date UNIQUE (grade_id, date)
 );
 
 -- Create forecasted production
@@ -36,7 +37,8 @@ CREATE TABLE forecasted_production (
     id SERIAL PRIMARY KEY,
     date DATE NOT NULL,
     heats INTEGER NOT NULL,
-    product_group_id INTEGER NOT NULL REFERENCES product_groups(id)
+    product_group_id INTEGER NOT NULL REFERENCES product_groups(id),
+    CONSTRAINT uq_forecasted_production_group_date UNIQUE (product_group_id, date)
 );
 
 -- Create daily production schedule
@@ -50,3 +52,6 @@ CREATE TABLE daily_production_schedule (
 
 -- simple index for date-based queries on historical production
 CREATE INDEX idx_historical_production_date ON historical_production(date);
+
+-- date (and grade) lookups on the daily production schedule
+CREATE INDEX idx_daily_production_schedule_date_grade ON daily_production_schedule(date, grade_id);
@@ -0,0 +1,48 @@
+-- Bring a database created before the ON CONFLICT uploads up to init.sql.
+-- create_all only creates missing tables, so existing ones need these
+-- constraints added by hand. Safe to run more than once:
+--   psql -d steel_db -f migrations/001_unique_production_dates.sql
+
+BEGIN;
+
+-- Keep the first row (lowest id) of each duplicated (grade_id, date)
+DELETE FROM historical_production AS dup
+USING historical_production AS kept
+WHERE dup.grade_id = kept.grade_id
+  AND dup.date = kept.date
+  AND dup.id > kept.id;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conname = 'uq_historical_production_grade_date'
+    ) THEN
+        ALTER TABLE historical_production
+            ADD CONSTRAINT uq_historical_production_grade_date UNIQUE (grade_id, date);
+    END IF;
+END $$;
+
+-- Keep the first row (lowest id) of each duplicated (product_group_id, date)
+DELETE FROM forecasted_production AS dup
+USING forecasted_production AS kept
+WHERE dup.product_group_id = kept.product_group_id
+  AND dup.date = kept.date
+  AND dup.id > kept.id;
+
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conname = 'uq_forecasted_production_group_date'
+    ) THEN
+        ALTER TABLE forecasted_production
+            ADD CONSTRAINT uq_forecasted_production_group_date UNIQUE (product_group_id, date);
+    END IF;
+END $$;
+
+-- date (and grade) lookups on the daily production schedule
+CREATE INDEX IF NOT EXISTS idx_daily_production_schedule_date_grade
+    ON daily_production_schedule(date, grade_id);
+
+COMMIT;
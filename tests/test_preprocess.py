@@ -0,0 +1,257 @@
+"""
+Parser tests for utility.preprocess that don't require database connection.
+Run with: pytest tests/test_preprocess.py
+"""
+
+import re
+import zipfile
+from datetime import date, datetime, time
+from io import BytesIO
+from pathlib import Path
+
+import pandas as pd
+import pytest
+from fastapi import UploadFile
+from openpyxl import Workbook
+
+from utility import preprocess
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+
+def upload(content: bytes, filename: str) -> UploadFile:
+    """Wrap raw bytes the way FastAPI hands an upload to the routes."""
+    return UploadFile(BytesIO(content), filename=filename)
+
+
+def ragged_schedule_xlsx() -> bytes:
+    """
+    Build a daily schedule whose rows come back from openpyxl's read_only mode
+    with different lengths: sparse cells, an empty row and no <dimension>.
+    """
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Daily charge schedule"])
+    ws.append([datetime(2024, 8, 30), None, None, datetime(2024, 8, 31)])
+    ws.append(["Start time", "Grade", "Mould size"] * 2)
+    ws.append([time(0, 14), "B500B", '5"', time(1, 0), "A36", '6"'])
+    ws.append([time(1, 25), "B500C", '5"'])
+    # A styled row with no cells is read back as an empty tuple
+    ws.row_dimensions[6].height = 20
+    ws.append([])
+    ws.append([None, None, None, time(2, 0), "B500A", '6"'])
+
+    saved = BytesIO()
+    wb.save(saved)
+
+    stripped = BytesIO()
+    with zipfile.ZipFile(saved) as src, zipfile.ZipFile(stripped, "w") as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            if item.filename.startswith("xl/worksheets/"):
+                data = re.sub(rb"<dimension[^>]*/>", b"", data)
+            dst.writestr(item, data)
+    return stripped.getvalue()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a temporary directory, since schedules are saved to data/processed."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_handle_non_tabular_ragged_rows(workdir):
+    """Test triplet parsing of a sparse xlsx without a <dimension> element."""
+    schedules = preprocess.handle_non_tabular(
+        upload(ragged_schedule_xlsx(), "schedule.xlsx")
+    )
+
+    assert list(schedules) == ["2024-08-30", "2024-08-31"]
+    assert schedules["2024-08-30"]["grade"].tolist() == ["B500B", "B500C"]
+    assert schedules["2024-08-31"]["grade"].tolist() == ["A36", "B500A"]
+    assert schedules["2024-08-31"]["mould_size"].tolist() == ['6"', '6"']
+    assert (workdir / "data/processed/charge_schedule_2024-08-31.csv").exists()
+
+
+def sample(name: str) -> bytes:
+    """Read one of the sample files shipped in data/."""
+    return (DATA_DIR / name).read_bytes()
+
+
+SCHEDULE_GRADES = {
+    "2024-08-30": ["B500B"] * 3 + ["B500C"] + [f"A53/C59{i}" for i in range(1, 10)],
+    "2024-08-31": ["A53/C600", "B500A", "B500A"] + ["B500B"] * 8,
+    "2024-09-01": ["C35", "C40"] + ["B500B"] * 11,
+}
+
+
+def test_handle_non_tabular_sample(workdir):
+    """Test the daily schedule sample splits into per-date charges."""
+    schedules = preprocess.handle_non_tabular(
+        upload(sample("daily_charge_schedule.xlsx"), "schedule.xlsx")
+    )
+
+    assert list(schedules) == list(SCHEDULE_GRADES)
+    for date_str, grades in SCHEDULE_GRADES.items():
+        # "-" filler triplets are skipped
+        assert schedules[date_str]["grade"].tolist() == grades
+        assert list(schedules[date_str].columns) == [
+            "start_time",
+            "grade",
+            "mould_size",
+        ]
+    first = schedules["2024-08-31"].iloc[0]
+    assert str(first["start_time"]) == "1900-01-01 00:50:00"
+    assert first["mould_size"] == '6" RD'
+    saved = pd.read_csv(workdir / "data/processed/charge_schedule_2024-09-01.csv")
+    assert saved["grade"].tolist() == SCHEDULE_GRADES["2024-09-01"]
+
+
+def test_handle_non_tabular_block_boundaries(workdir, monkeypatch):
+    """Test entries keep their order when a date's rows span several blocks."""
+    monkeypatch.setattr(preprocess, "CSV_CHUNK_ROWS", 3)
+
+    schedules = preprocess.handle_non_tabular(
+        upload(sample("daily_charge_schedule.xlsx"), "schedule.xlsx")
+    )
+
+    assert {k: v["grade"].tolist() for k, v in schedules.items()} == SCHEDULE_GRADES
+
+
+def test_handle_non_tabular_csv_skips_blank_grades(workdir):
+    """Test empty, blank and filler grade cells in a CSV schedule are skipped."""
+    content = (
+        "Daily charge schedule,,,,,\n"
+        "2024-08-30,,,2024-08-31,,\n"
+        "Start time,Grade,Mould size,Start time,Grade,Mould size\n"
+        '00:14,B500B,5",01:00, ,6"\n'
+        '01:25,-,5",02:00,,6"\n'
+        '02:40,B500C,5",03:00,A36,6"\n'
+    ).encode()
+
+    schedules = preprocess.handle_non_tabular(upload(content, "schedule.csv"))
+
+    assert {k: v["grade"].tolist() for k, v in schedules.items()} == {
+        "2024-08-30": ["B500B", "B500C"],
+        "2024-08-31": ["A36"],
+    }
+
+
+def product_groups_xlsx_with_blank_column() -> bytes:
+    """Build a product group sheet with an empty, unlabelled column between dates."""
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Monthly product groups"])
+    ws.append(["Quality:", datetime(2024, 6, 24), None, datetime(2024, 7, 24)])
+    ws.append(["Rebar", 238, None, 240])
+    ws.append(["MBQ", 18, None, 20])
+    ws.append(["SBQ", None, None, 6])
+
+    saved = BytesIO()
+    wb.save(saved)
+    return saved.getvalue()
+
+
+def test_iter_product_groups_blank_column():
+    """Test a blank column in a product group sheet is dropped before parsing dates."""
+    df = pd.concat(
+        preprocess.iter_product_groups(
+            upload(product_groups_xlsx_with_blank_column(), "groups.xlsx")
+        ),
+        ignore_index=True,
+    )
+
+    assert list(df.columns) == ["product_group_name", "date", "heats"]
+    assert sorted(set(df["date"].astype(str))) == ["2024-06-24", "2024-07-24"]
+    assert len(df.dropna(subset=["heats"])) == 5
+
+
+def steel_grade_csv() -> bytes:
+    """The steel grade production sample as a CSV upload, title row included."""
+    sheet = pd.read_excel(
+        DATA_DIR / "steel_grade_production.xlsx", header=None, engine="calamine"
+    )
+    return sheet.to_csv(index=False, header=False).encode()
+
+
+@pytest.mark.parametrize(
+    "filename, content",
+    [
+        ("history.xlsx", lambda: sample("steel_grade_production.xlsx")),
+        ("history.csv", steel_grade_csv),
+    ],
+)
+def test_iter_steel_grade_chunks(filename, content):
+    """Test small chunks give the single-chunk result, carrying the group across."""
+
+    def melt(chunksize):
+        frames = preprocess.iter_steel_grade(
+            upload(content(), filename), chunksize=chunksize
+        )
+        df = pd.concat(frames, ignore_index=True)
+        return df.sort_values(["grade_name", "date"], ignore_index=True)
+
+    whole = melt(chunksize=1000)
+    chunked = melt(chunksize=3)
+
+    pd.testing.assert_frame_equal(chunked, whole)
+    assert chunked["product_group_id"].notna().all()
+    # Empty columns are dropped per chunk, so no unparsed headers come through
+    assert sorted(set(whole["date"].astype(str))) == [
+        "2024-06-24",
+        "2024-07-24",
+        "2024-08-24",
+    ]
+    # 60W opens the fourth 3-row chunk with a blank group cell
+    groups_60w = chunked.loc[chunked["grade_name"] == "60W", "product_group_id"]
+    assert set(groups_60w) == {"MBQ"}
+
+
+def test_melt_dates_product_groups():
+    """Test the product group sample melts to one row per group and date."""
+    sheet = preprocess.sheet_to_pandas(
+        upload(sample("product_groups_monthly.xlsx"), "groups.xlsx")
+    ).rename(columns={"Quality:": "product_group_name"})
+
+    df = preprocess.melt_dates(
+        sheet, id_vars=["product_group_name"], value_name="heats"
+    )
+    blocks = preprocess.iter_melt_dates(
+        sheet, id_vars=["product_group_name"], value_name="heats", chunksize=3
+    )
+
+    assert len(df) == 4 * 4
+    assert list(df.columns) == ["product_group_name", "date", "heats"]
+    assert df["date"].iloc[0] == date(2024, 6, 24)
+    rebar = df[df["product_group_name"] == "Rebar"]
+    assert rebar["heats"].tolist()[0] == 238
+    pd.testing.assert_frame_equal(
+        pd.concat(blocks).sort_values(
+            ["product_group_name", "date"], ignore_index=True
+        ),
+        df.sort_values(["product_group_name", "date"], ignore_index=True),
+    )
+
+
+def test_sheet_to_pandas_cache(monkeypatch):
+    """Test a re-uploaded sheet is served from the content-hash cache."""
+    preprocess.sheet_cache.clear()
+    parse = preprocess._parse_sheet
+    calls = []
+
+    def counting_parse(*args):
+        calls.append(args)
+        return parse(*args)
+
+    monkeypatch.setattr(preprocess, "_parse_sheet", counting_parse)
+    content = sample("product_groups_monthly.xlsx")
+
+    first = preprocess.sheet_to_pandas(upload(content, "groups.xlsx"))
+    first["extra"] = 1
+    second = preprocess.sheet_to_pandas(upload(content, "groups.xlsx"))
+    preprocess.sheet_to_pandas(upload(content, "groups.xlsx"), skip=0)
+
+    assert len(calls) == 2
+    # Callers get their own frame, so adding columns leaves the cache intact
+    assert "extra" not in second.columns
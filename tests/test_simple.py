@@ -3,22 +3,24 @@ Simple API tests that don't require database connection.
 Run with: pytest tests/test_simple.py
 """
 
+import orjson
+import pytest
 from fastapi.testclient import TestClient
-from fastapi import FastAPI, APIRouter
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, Response
+from fastapi.responses import ORJSONResponse
 from datetime import datetime
 
-
 # Create a simple test app without database dependencies
-test_app = FastAPI(title="Test Steel Production API")
+test_app = FastAPI(
+    title="Test Steel Production API", default_response_class=ORJSONResponse
+)
 
 test_router = APIRouter()
 
 
-@test_router.get("/")
-def root():
-    """Test root endpoint"""
-    return {
+# Static payloads, serialized once like the real app's root endpoint
+ROOT_BODY = orjson.dumps(
+    {
         "message": "Steel Production Forecast API",
         "version": "1.0.0",
         "docs": "/docs",
@@ -31,17 +33,27 @@ def root():
             "steel_grades": "/steel-grades",
         },
     }
+)
+HEALTH_BASE = {
+    "status": "healthy",
+    "database": "test",
+    "data_summary": {"product_groups": 0, "steel_grades": 0},
+}
+
+
+@test_router.get("/")
+def root():
+    """Test root endpoint"""
+    return Response(content=ROOT_BODY, media_type="application/json")
 
 
 @test_router.get("/health")
 def health_check():
     """Test health check endpoint"""
-    return {
-        "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
-        "database": "test",
-        "data_summary": {"product_groups": 0, "steel_grades": 0},
-    }
+    return Response(
+        content=orjson.dumps({**HEALTH_BASE, "timestamp": datetime.now().isoformat()}),
+        media_type="application/json",
+    )
 
 
 @test_router.get("/product-groups")
@@ -60,7 +72,7 @@ def get_steel_grades():
 def forecast_production(request: dict):
     """Test forecast endpoint"""
     if not request.get("grade_percentages"):
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=400,
             content={"error": "Bad Request", "detail": "No grade percentages provided"},
         )
@@ -73,10 +85,21 @@ def forecast_production(request: dict):
 
 test_app.include_router(test_router)
 
-client = TestClient(test_app)
+
+@pytest.fixture(scope="module")
+def client():
+    """One TestClient for the module, with app startup and shutdown run once."""
+    with TestClient(test_app) as c:
+        yield c
 
 
-def test_root_endpoint():
+@pytest.fixture(scope="module")
+def openapi_schema():
+    """The app's OpenAPI schema, generated once and memoized by FastAPI."""
+    return test_app.openapi()
+
+
+def test_root_endpoint(client):
     """Test the root endpoint returns API information."""
     response = client.get("/")
     assert response.status_code == 200
@@ -86,7 +109,7 @@ def test_root_endpoint():
     assert "endpoints" in data
 
 
-def test_health_check():
+def test_health_check(client):
     """Test the health check endpoint."""
     response = client.get("/health")
     assert response.status_code == 200
@@ -96,7 +119,7 @@ def test_health_check():
     assert "timestamp" in data
 
 
-def test_get_product_groups_empty():
+def test_get_product_groups_empty(client):
     """Test getting product groups when database is empty."""
     response = client.get("/product-groups")
     assert response.status_code == 200
@@ -104,7 +127,7 @@ def test_get_product_groups_empty():
     assert len(response.json()) == 0
 
 
-def test_get_steel_grades_empty():
+def test_get_steel_grades_empty(client):
     """Test getting steel grades when database is empty."""
     response = client.get("/steel-grades")
     assert response.status_code == 200
@@ -112,14 +135,14 @@ def test_get_steel_grades_empty():
     assert len(response.json()) == 0
 
 
-def test_forecast_endpoint_with_empty_request():
+def test_forecast_endpoint_with_empty_request(client):
     """Test forecast endpoint with empty grade percentages."""
     response = client.post("/forecast", json={"grade_percentages": {}})
     assert response.status_code == 400
     assert "No grade percentages provided" in response.json()["detail"]
 
 
-def test_forecast_endpoint_with_valid_request():
+def test_forecast_endpoint_with_valid_request(client):
     """Test forecast endpoint with valid request."""
     response = client.post(
         "/forecast", json={"grade_percentages": {"B500A": 50, "B500B": 50}}
@@ -132,22 +155,19 @@ def test_forecast_endpoint_with_valid_request():
     assert data["grade_breakdown"]["B500B"] == 0
 
 
-def test_docs_endpoint():
+def test_docs_endpoint(client):
     """Test that API documentation is accessible."""
     response = client.get("/docs")
     assert response.status_code == 200
 
 
-def test_openapi_endpoint():
-    """Test that OpenAPI JSON is accessible."""
-    response = client.get("/openapi.json")
-    assert response.status_code == 200
-    data = response.json()
-    assert data["info"]["title"] == "Test Steel Production API"
-    assert "paths" in data
+def test_openapi_schema(openapi_schema):
+    """Test that the OpenAPI schema describes the app and its routes."""
+    assert openapi_schema["info"]["title"] == "Test Steel Production API"
+    assert "/forecast" in openapi_schema["paths"]
 
 
-def test_api_structure():
+def test_api_structure(client):
     """Test that the API has expected structure."""
     root_response = client.get("/")
     assert root_response.status_code == 200
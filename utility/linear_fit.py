@@ -1,34 +1,75 @@
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy.stats import linregress
+from matplotlib.figure import Figure
+from pathlib import Path
+from typing import Optional, Tuple
 
 
-def plot_linear_fit(data: dict) -> None:
+def linear_fit(x: np.ndarray, y: np.ndarray) -> Tuple[float, float, float]:
+    """
+    Least-squares line through (x, y) in closed form.
+
+    Args:
+        x (np.ndarray): Independent values
+        y (np.ndarray): Dependent values, same length as x
+
+    Returns:
+        Tuple[float, float, float]: Slope, intercept and Pearson correlation R.
+    """
+    dx = x - x.mean()
+    dy = y - y.mean()
+    sxy = dx @ dy
+    sxx = dx @ dx
+    slope = sxy / sxx
+    intercept = y.mean() - slope * x.mean()
+    r_value = sxy / np.sqrt(sxx * (dy @ dy))
+    return slope, intercept, r_value
+
+
+def plot_linear_fit(
+    data: dict,
+    xlabel: str = "Short Tons",
+    ylabel: str = "Number of Heats Predicted",
+    output_dir: Optional[str] = None,
+) -> None:
     """
     Plot linear regression fits for multiple datasets.
 
     Args:
         data (dict): Dictionary where keys are labels and values are tuples of
                     (x_values, y_values, color) for plotting.
+        xlabel (str): X axis label
+        ylabel (str): Y axis label
+        output_dir (Optional[str]): Save each plot as <label>_linear_fit.png here
+                    instead of showing it
 
     Returns:
-        None: Displays plots using matplotlib.
+        None: Displays plots using matplotlib, or writes them to output_dir.
     """
     for label, (x, y, color) in data.items():
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
 
-        slope, intercept, r_value, _, _ = linregress(x, y)
+        slope, intercept, r_value = linear_fit(x, y)
         line_eq = f"{label} Fit: y = {slope:.2f}x + {intercept:.2f} (R = {r_value:.3f})"
 
-        x_fit = np.linspace(min(x), max(x), 100)
+        # A straight line only needs its endpoints
+        x_fit = np.array([x.min(), x.max()])
         y_fit = slope * x_fit + intercept
 
-        plt.figure(figsize=(6, 4))
-        plt.plot(x, y, "o", color=color, label="Data Points")
-        plt.plot(x_fit, y_fit, "-", color=color, alpha=0.6, label="Linear Fit")
-        plt.title(f"{label} - Linear Fit\n{line_eq}")
-        plt.xlabel("Short Tons")
-        plt.ylabel("Number of Heats Predicted")
-        plt.grid(True)
-        plt.legend()
-        plt.tight_layout()
-        plt.show()
+        # A bare Figure renders with Agg and never touches the GUI backend
+        fig = Figure(figsize=(6, 4)) if output_dir else plt.figure(figsize=(6, 4))
+        ax = fig.subplots()
+        ax.plot(x, y, "o", color=color, label="Data Points")
+        ax.plot(x_fit, y_fit, "-", color=color, alpha=0.6, label="Linear Fit")
+        ax.set_title(f"{label} - Linear Fit\n{line_eq}")
+        ax.set_xlabel(xlabel)
+        ax.set_ylabel(ylabel)
+        ax.grid(True)
+        ax.legend()
+        fig.tight_layout()
+
+        if output_dir:
+            fig.savefig(Path(output_dir) / f"{label}_linear_fit.png", dpi=100)
+        else:
+            plt.show()
@@ -1,91 +1,227 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import hashlib
+from cachetools import TTLCache
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import os
 from openpyxl import load_workbook
 from fastapi import UploadFile
-from io import BytesIO
+from itertools import islice
+from pathlib import Path
+from threading import Lock
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
 
+# Block size used by the Arrow CSV reader (bytes per parsed chunk)
+CSV_BLOCK_SIZE = 8 << 20
 
-def handle_non_tabular(file: UploadFile) -> bool:
+# File extensions the parsers below understand
+ALLOWED_EXTENSIONS = frozenset({".csv", ".xlsx", ".xls"})
+
+# Sheet rows read per chunk when streaming CSV uploads
+CSV_CHUNK_ROWS = 50_000
+
+# Date headers are Excel datetimes or ISO strings ("2024-06-24 00:00:00")
+DATE_FMT = "ISO8601"
+
+# Recently parsed tabular sheets, keyed by (content hash, extension, skip).
+# Bounded by the frames' in-memory size rather than their count, and expired
+# after SHEET_CACHE_TTL seconds so parsed uploads are not kept indefinitely.
+SHEET_CACHE_BYTES = 64 << 20
+SHEET_CACHE_TTL = 300
+sheet_cache = TTLCache(
+    maxsize=SHEET_CACHE_BYTES,
+    ttl=SHEET_CACHE_TTL,
+    getsizeof=lambda df: int(df.memory_usage(index=True, deep=True).sum()),
+)
+_sheet_lock = Lock()
+
+# Threads used to write the per-date processed schedule CSVs
+CSV_WRITE_WORKERS = 8
+
+# Columns of a parsed daily schedule, in sheet order
+SCHEDULE_COLUMNS = ("start_time", "grade", "mould_size")
+
+# Grade cells that are filler or repeated headers rather than a charge
+SKIP_GRADES = frozenset({"-", "Grade", ""})
+
+
+def file_extension(file: UploadFile) -> str:
+    """
+    Get the lowercased extension of an uploaded file, e.g. ".csv".
+
+    Args:
+        file (UploadFile): Uploaded file object
+
+    Returns:
+        str: File suffix including the dot, or "" when there is none (or no
+        filename was sent at all).
+    """
+    return Path(file.filename or "").suffix.lower()
+
+
+def handle_non_tabular(file: UploadFile) -> Optional[Dict[str, pd.DataFrame]]:
     """
     Parses non-tabular Excel or CSV file with triplet-format rows.
 
+    Each date's entries are also saved to data/processed/charge_schedule_<date>.csv.
+
     Args:
         file (UploadFile): Uploaded file object (.xlsx, .xls, .csv)
 
     Returns:
-        bool: True if saving was successful, False otherwise.
+        Optional[Dict[str, pd.DataFrame]]: start_time, grade and mould_size rows
+        keyed by "YYYY-MM-DD" date, or None if saving failed.
     """
-    ext = os.path.splitext(file.filename)[-1].lower()
-    rows = []
+    ext = file_extension(file)
+    wb = None
 
     if ext == ".xlsx":
-        wb = load_workbook(BytesIO(file.file.read()), data_only=True)
-        ws = wb.active
-        rows = list(ws.iter_rows(values_only=True))
-        file.file.seek(0)
+        # Read-only mode streams rows from the sheet XML instead of building cells,
+        # reading the spooled upload in place rather than from an in-memory copy
+        wb = load_workbook(file.file, data_only=True, read_only=True)
+        rows = wb.active.iter_rows(values_only=True)
 
     elif ext == ".xls":
         df = pd.read_excel(file.file, header=None, engine="xlrd")
-        rows = df.values.tolist()
+        rows = iter(df.values.tolist())
         file.file.seek(0)
 
     elif ext == ".csv":
         df = pd.read_csv(file.file, header=None)
-        rows = df.values.tolist()
+        rows = iter(df.values.tolist())
         file.file.seek(0)
 
     else:
         raise ValueError(f"Unsupported file format: {ext}")
 
-    date_row = rows[1]
+    # Row 0 is a title, row 1 holds one date per triplet, row 2 the column headers
+    next(rows)
+    date_row = next(rows)
     dates = list(date_row)[::3]
+    next(rows)
 
-    date_to_entries = defaultdict(list)
+    # Triplets sharing a date header are filed under the first one's index
+    first_idx = [dates.index(d) for d in dates]
+    has_date = np.array([bool(d) for d in dates], dtype=bool)
+    date_to_cols = defaultdict(lambda: {col: [] for col in SCHEDULE_COLUMNS})
 
-    for row in rows[3:]:
-        for i in range(0, len(row), 3):
+    while block := list(islice(rows, CSV_CHUNK_ROWS)):
+        # (rows, cols) -> one (start_time, grade, mould_size) line per triplet,
+        # row-major so entries keep their sheet order within each date
+        cells = _pad_rows(block)
+        n_triplets = min(cells.shape[1] // 3, len(dates))
+        cells = cells[:, : n_triplets * 3].reshape(-1, 3)
+        date_idx = np.tile(np.arange(n_triplets), len(block))
 
-            start_time = row[i]
-            grade = row[i + 1]
-            mould_size = row[i + 2]
+        # Drop empty cells (None from openpyxl, NaN from pandas) before any
+        # string work, so only populated grades are coerced and stripped
+        keep = has_date[date_idx] & pd.notna(cells[:, 1])
+        grades = pd.Series(cells[keep, 1], dtype=object).astype(str).str.strip()
+        valid = ~grades.isin(SKIP_GRADES).to_numpy()
+        keep[keep] = valid
 
-            if grade is None or str(grade).strip() in ("-", "Grade"):
-                continue
+        # Each date collects plain column arrays; its frame is built once on save
+        block_cols = (cells[keep, 0], grades.to_numpy()[valid], cells[keep, 2])
+        keys = np.take(first_idx, date_idx[keep])
+        for idx in pd.unique(keys):
+            in_date = keys == idx
+            cols = date_to_cols[dates[idx]]
+            for col, values in zip(SCHEDULE_COLUMNS, block_cols):
+                cols[col].append(values[in_date])
 
-            entry = {
-                "start_time": start_time,
-                "grade": str(grade).strip(),
-                "mould_size": mould_size,
-            }
-
-            try:
-                date_key = dates[i // 3]
-                if date_key:
-                    date_to_entries[date_key].append(entry)
-            except IndexError:
-                continue
+    if wb is not None:
+        wb.close()
 
-    # Save output
+    # Save output; the per-date CSV writes are independent, so run them side by side
     os.makedirs("data/processed", exist_ok=True)
-    processed_files = []
-    for date, entries in date_to_entries.items():
-        try:
-            df = pd.DataFrame(entries)
-            date_str = pd.to_datetime(date).strftime("%Y-%m-%d")
-            output_path = f"data/processed/charge_schedule_{date_str}.csv"
-            df.to_csv(output_path, index=False)
-            processed_files.append(output_path)
-        except Exception as e:
-            return False
+    if not date_to_cols:
+        return {}
+    workers = min(CSV_WRITE_WORKERS, len(date_to_cols))
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            saved = list(executor.map(_save_schedule, date_to_cols.items()))
+    except Exception:
+        return None
+
+    return dict(saved)
+
+
+def _pad_rows(block: List[tuple]) -> np.ndarray:
+    """
+    Stack sheet rows into a 2-D object array, padding short rows with None.
+
+    openpyxl's read_only mode yields rows of different lengths (down to empty
+    rows) when a sheet has sparse cells or no <dimension> element.
+
+    Args:
+        block (List[tuple]): Rows of cell values
+
+    Returns:
+        np.ndarray: (len(block), widest row) array of cell values.
+    """
+    cells = np.full((len(block), max(map(len, block))), None, dtype=object)
+    for i, row in enumerate(block):
+        cells[i, : len(row)] = row
+    return cells
+
 
-    return True
+def _save_schedule(
+    item: Tuple[object, Dict[str, List[np.ndarray]]],
+) -> Tuple[str, pd.DataFrame]:
+    """
+    Build one date's schedule and write it to data/processed.
+
+    Args:
+        item (Tuple[object, Dict[str, List[np.ndarray]]]): Date header and its
+            column arrays, one per block
+
+    Returns:
+        Tuple[str, pd.DataFrame]: "YYYY-MM-DD" date and the combined entries.
+    """
+    date, cols = item
+    df = pd.DataFrame(
+        {col: np.concatenate(parts) for col, parts in cols.items()}
+    ).infer_objects()
+    date_str = pd.to_datetime(date).strftime("%Y-%m-%d")
+    output_path = f"data/processed/charge_schedule_{date_str}.csv"
+    try:
+        pa_csv.write_csv(_csv_table(df), output_path)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type object columns have no Arrow type; let pandas format them
+        df.to_csv(output_path, index=False)
+    return date_str, df
+
+
+def _csv_table(df: pd.DataFrame) -> pa.Table:
+    """
+    Convert a schedule frame to an Arrow table for the CSV writer.
+
+    Args:
+        df (pd.DataFrame): start_time, grade and mould_size rows
+
+    Returns:
+        pa.Table: Table with timestamps at second precision, so they are written
+        as "1900-01-01 00:14:00" rather than with a nanosecond suffix.
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            # Safe cast: sub-second values raise and fall back to pandas
+            seconds = table.column(i).cast(pa.timestamp("s"))
+            table = table.set_column(i, field.name, seconds)
+    return table
 
 
 def sheet_to_pandas(file: UploadFile, skip=1) -> pd.DataFrame:
     """
     Load a spreadsheet into a pandas DataFrame for tabular data.
 
+    Parsed sheets are cached by content hash, so re-uploading the same file
+    skips the parse.
+
     Args:
         file (UploadFile): Uploaded file object (.xlsx, .xls, .csv)
         skip (int): Number of rows to skip from the top
@@ -93,21 +229,201 @@ def sheet_to_pandas(file: UploadFile, skip=1) -> pd.DataFrame:
     Returns:
         pd.DataFrame: Parsed DataFrame.
     """
-    ext = os.path.splitext(file.filename)[-1].lower()
+    ext = file_extension(file)
+    if ext not in ALLOWED_EXTENSIONS:
+        raise ValueError(f"Unsupported file format: {ext}")
 
-    if ext == ".xlsx":
-        return pd.read_excel(
-            BytesIO(file.file.read()), engine="openpyxl", skiprows=skip
-        )
+    key = (content_hash(file), ext, skip)
+    with _sheet_lock:
+        df = sheet_cache.get(key)
+    if df is None:
+        df = _parse_sheet(file.file, ext, skip)
+        with _sheet_lock:
+            try:
+                sheet_cache[key] = df
+            except ValueError:
+                pass  # larger than the whole cache; parse it again next time
+    # Shallow copy so callers adding or replacing columns leave the cache intact
+    return df.copy(deep=False)
 
-    elif ext == ".xls":
-        return pd.read_excel(BytesIO(file.file.read()), engine="xlrd", skiprows=skip)
 
-    elif ext == ".csv":
-        return pd.read_csv(BytesIO(file.file.read()), encoding="utf-8", skiprows=skip)
+def content_hash(file: UploadFile) -> bytes:
+    """
+    Hash an upload's bytes without holding them all in memory.
+
+    Args:
+        file (UploadFile): Uploaded file object, rewound afterwards
+
+    Returns:
+        bytes: 16-byte BLAKE2b digest of the file content.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for block in iter(lambda: file.file.read(CSV_BLOCK_SIZE), b""):
+        digest.update(block)
+    file.file.seek(0)
+    return digest.digest()
+
+
+def _parse_sheet(source: BinaryIO, ext: str, skip: int) -> pd.DataFrame:
+    """
+    Parse a tabular upload, bypassing the sheet cache.
+
+    Args:
+        source (BinaryIO): Spooled upload (.xlsx, .xls, .csv), parsed in place
+        ext (str): Lowercased file extension
+        skip (int): Number of rows to skip from the top
+
+    Returns:
+        pd.DataFrame: Parsed DataFrame.
+    """
+    if ext in (".xlsx", ".xls"):
+        # calamine parses the workbook in Rust, much faster than openpyxl/xlrd
+        return pd.read_excel(source, engine="calamine", skiprows=skip)
+
+    # Arrow's multithreaded reader streams straight from the spooled upload
+    table = pa_csv.read_csv(
+        source,
+        read_options=pa_csv.ReadOptions(
+            skip_rows=skip, use_threads=True, block_size=CSV_BLOCK_SIZE
+        ),
+        convert_options=pa_csv.ConvertOptions(strings_can_be_null=True),
+    )
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def parse_dates(values) -> list:
+    """
+    Convert date headers to datetime.date in one vectorized pass.
+
+    Args:
+        values: Date strings or datetimes (e.g. the date columns of a wide sheet)
+
+    Returns:
+        list: datetime.date objects in the same order.
+    """
+    return list(pd.to_datetime(pd.Index(values), format=DATE_FMT).date)
+
+
+def melt_dates(df: pd.DataFrame, id_vars: list, value_name: str) -> pd.DataFrame:
+    """
+    Reshape a wide sheet with one column per date into long format.
+
+    The date headers are parsed on the wide frame, so the conversion runs once
+    per column rather than once per melted row.
+
+    Args:
+        df (pd.DataFrame): Wide DataFrame holding only id and date columns
+        id_vars (list): Identifier columns kept on every row
+        value_name (str): Name of the melted value column
+
+    Returns:
+        pd.DataFrame: Long DataFrame with id columns, date and value_name.
+    """
+    date_columns = [col for col in df.columns if col not in id_vars]
+    df = df.rename(columns=dict(zip(date_columns, parse_dates(date_columns))))
+    return df.melt(id_vars=id_vars, var_name="date", value_name=value_name)
+
+
+def iter_melt_dates(
+    df: pd.DataFrame, id_vars: list, value_name: str, chunksize: int = CSV_CHUNK_ROWS
+) -> Iterator[pd.DataFrame]:
+    """
+    Melt a wide sheet with melt_dates in blocks of chunksize sheet rows.
+
+    The long frame is rows x dates, so melting block by block keeps it bounded
+    by the block instead of the whole sheet.
+
+    Args:
+        df (pd.DataFrame): Wide DataFrame holding only id and date columns
+        id_vars (list): Identifier columns kept on every row
+        value_name (str): Name of the melted value column
+        chunksize (int): Sheet rows melted per block
 
+    Yields:
+        pd.DataFrame: Long DataFrame with id columns, date and value_name.
+    """
+    for start in range(0, len(df), chunksize):
+        yield melt_dates(df.iloc[start : start + chunksize], id_vars, value_name)
+
+
+def iter_product_groups(
+    file: UploadFile, chunksize: int = CSV_CHUNK_ROWS
+) -> Iterator[pd.DataFrame]:
+    """
+    Load a product group sheet and melt it to long format in blocks.
+
+    The sheet is parsed when this is called; the blocks are melted lazily as
+    they are consumed.
+
+    Args:
+        file (UploadFile): Uploaded file object (.xlsx, .xls, .csv)
+        chunksize (int): Sheet rows melted per block
+
+    Returns:
+        Iterator[pd.DataFrame]: Long DataFrames with product_group_name, date, heats.
+    """
+    df = sheet_to_pandas(file)
+    # Blank columns (e.g. "Unnamed: 3") have no date header to parse
+    df = df.dropna(axis=1, how="all")
+    df = df.rename(columns={"Quality:": "product_group_name"})
+    return iter_melt_dates(
+        df, id_vars=["product_group_name"], value_name="heats", chunksize=chunksize
+    )
+
+
+def iter_steel_grade(
+    file: UploadFile, col_name: str = "Quality group", chunksize: int = CSV_CHUNK_ROWS
+) -> Iterator[pd.DataFrame]:
+    """
+    Load a steel grade sheet and yield it in long format, chunk by chunk.
+
+    CSV uploads are read chunksize rows at a time, so memory is bounded by the
+    chunk rather than the file; Excel sheets are parsed whole but melted in
+    chunksize-row blocks, so the long frame never holds the whole sheet at once.
+    The forward-filled column is carried across chunk boundaries.
+
+    Args:
+        file (UploadFile): Uploaded file object (.xlsx, .xls, .csv)
+        col_name (str): Column name to apply forward fill
+        chunksize (int): Sheet rows per chunk
+
+    Yields:
+        pd.DataFrame: Long DataFrame with grade_name, product_group_id, date, tons.
+    """
+    if file_extension(file) == ".csv":
+        # Label columns are read as text so only the date columns go through inference
+        chunks = pd.read_csv(
+            file.file,
+            skiprows=1,
+            chunksize=chunksize,
+            dtype={"Grade": str, col_name: str},
+        )
     else:
-        raise ValueError(f"Unsupported file format: {ext}")
+        sheet = sheet_to_pandas(file, skip=1)
+        chunks = (
+            sheet.iloc[start : start + chunksize]
+            for start in range(0, len(sheet), chunksize)
+        )
+
+    last_group = None
+    for chunk in chunks:
+        empty = chunk.columns[chunk.isna().all()].difference([col_name])
+        groups = chunk[col_name].ffill()
+        if last_group is not None:
+            groups = groups.fillna(last_group)
+        if groups.notna().any():
+            last_group = groups.iloc[-1]
+
+        # drop() already returns a new frame, so fill and relabel it in place
+        df = chunk.drop(columns=empty)
+        df[col_name] = groups
+        df.rename(
+            columns={"Grade": "grade_name", "Quality group": "product_group_id"},
+            inplace=True,
+        )
+        yield melt_dates(
+            df, id_vars=["grade_name", "product_group_id"], value_name="tons"
+        )
 
 
 def process_steel_grade(
@@ -123,14 +439,4 @@ def process_steel_grade(
     Returns:
         pd.DataFrame: Processed DataFrame.
     """
-    return (
-        sheet_to_pandas(file, skip=1)
-        .dropna(axis=1, how="all")
-        .assign(**{col_name: lambda df: df[col_name].ffill()})
-        .rename(columns={"Grade": "grade_name", "Quality group": "product_group_id"})
-        .melt(
-            id_vars=["grade_name", "product_group_id"],
-            var_name="date",
-            value_name="tons",
-        )
-    )
+    return pd.concat(iter_steel_grade(file, col_name), ignore_index=True)